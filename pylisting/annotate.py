@@ -13,10 +13,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from collections import defaultdict
+import re
+from typing import Dict, Iterable, Iterator, List, Sequence
 
+from pylisting.outputcapture import Output
 
-def group_by_line(history):
+_LINE_BOUNDARY = re.compile(r'\r\n|\r|\n')
+
+
+def group_by_line(history: Sequence[Output]) -> Dict[int, str]:
     """Group a history list by line.
 
     Parameters
@@ -26,22 +31,42 @@ def group_by_line(history):
 
     Returns
     -------
-    history_by_line : defaultdict mapping int to list of str
-        Dict which contains all of the outputs from a given line.
+    history_by_line : dict mapping int to str
+        Dict which contains all of the output from a given line, joined into a
+        single string. Lines which did not produce any output are not present.
     """
-    history_by_line = defaultdict(list)
+    history_by_line: Dict[int, List[str]] = {}
     for output in history:
-        history_by_line[output.caller_line].append(output.value)
-    return history_by_line
+        history_by_line.setdefault(output.caller_line, []).append(output.value)
+    return {
+        line: ''.join(values) for line, values in history_by_line.items()
+    }
 
 
-def format_output(lines):
+def format_output(lines: Sequence[str]) -> str:
     """Format 0 or more lines of text.
 
     Parameters
     ----------
-    lines : list of str
-        The line(s) to format. The output depends on the length of this list:
+    lines : sequence of str
+        The line(s) to format. These are joined, then formatted as described
+        in format_output_precomputed.
+
+    Returns
+    -------
+    text : str
+        The formatted text.
+    """
+    return format_output_precomputed(''.join(lines))
+
+
+def format_output_precomputed(full_text: str) -> str:
+    """Format text which has already been joined into a single string.
+
+    Parameters
+    ----------
+    full_text : str
+        The text to format. The output depends on how many lines it contains:
         * 0: empty string.
         * 1: '# ' is prepended to the one line.
         * >=2: the text is captured in a triple-quoted string.
@@ -51,7 +76,9 @@ def format_output(lines):
     text : str
         The formatted text.
     """
-    full_text = ''.join(lines)
+    # Checking for a single line by counting '\n' would also have to rule
+    # out the other boundaries splitlines uses, and benchmarks slower than
+    # splitlines itself.
     full_text_lines = full_text.splitlines()
     if len(full_text_lines) == 0:
         return ''
@@ -61,7 +88,52 @@ def format_output(lines):
         return '"""\n' + full_text + '"""\n'
 
 
-def annotate_program(program, stdout_history, stderr_history):
+def _iter_lines(program: str) -> Iterator[str]:
+    """Iterate over the lines of a program without building a list of them.
+
+    '\r\n', '\r' and '\n' are treated as line boundaries, as the tokenizer
+    does when numbering lines. Other characters which splitlines breaks on,
+    such as form feeds, are left inside the line. Every line is yielded with
+    a '\n' ending, including the last line of a program which does not end
+    with a newline.
+
+    Parameters
+    ----------
+    program : str
+        The program to split into lines.
+
+    Yields
+    ------
+    line : str
+        Each line of the program, ending with '\n'.
+    """
+    if '\r' in program:
+        start = 0
+        for match in _LINE_BOUNDARY.finditer(program):
+            yield program[start:match.start()] + '\n'
+            start = match.end()
+        if start < len(program):
+            yield program[start:] + '\n'
+        return
+
+    # Without carriage returns, each line can be sliced out along with its
+    # '\n' ending.
+    start = 0
+    n_chars = len(program)
+    while start < n_chars:
+        end = program.find('\n', start)
+        if end == -1:
+            yield program[start:] + '\n'
+            return
+        yield program[start:end + 1]
+        start = end + 1
+
+
+def annotate_program(
+    program: str,
+    stdout_history: Sequence[Output],
+    stderr_history: Sequence[Output]
+) -> str:
     """Create a new version of a program with stdout and stderr notated after
     each line.
 
@@ -74,6 +146,33 @@ def annotate_program(program, stdout_history, stderr_history):
     stderr_history : list of Output
         Each call to stderr.write, in the order it occurred.
 
+    Returns
+    -------
+    annotated_program : str
+        The program with output annotations added.
+    """
+    return annotate_lines(_iter_lines(program), stdout_history, stderr_history)
+
+
+def annotate_lines(
+    program_lines: Iterable[str],
+    stdout_history: Sequence[Output],
+    stderr_history: Sequence[Output]
+) -> str:
+    """Create a new version of a program with stdout and stderr notated after
+    each line, starting from the lines of the program.
+
+    Parameters
+    ----------
+    program_lines : iterable of str
+        The lines of the program, as it was executed, each ending with a
+        newline. This can be a lazy iterator, so the whole program does not
+        need to be split up front.
+    stdout_history : list of Output
+        Each call to stdout.write, in the order it occurred.
+    stderr_history : list of Output
+        Each call to stderr.write, in the order it occurred.
+
     Returns
     -------
     annotated_program : str
@@ -82,11 +181,16 @@ def annotate_program(program, stdout_history, stderr_history):
     stdout_history_by_line = group_by_line(stdout_history)
     stderr_history_by_line = group_by_line(stderr_history)
 
-    annotated_program = ''
-    for i_line, line in enumerate(program.splitlines()):
-        annotated_program += line
-        annotated_program += '\n'
-        annotated_program += format_output(stderr_history_by_line[i_line + 1])
-        annotated_program += format_output(stdout_history_by_line[i_line + 1])
+    # Collecting fragments in a list and joining once benchmarks faster than
+    # writing them to an io.StringIO.
+    annotated_program: List[str] = []
+    for line_number, line in enumerate(program_lines, start=1):
+        annotated_program.append(line)
+        stderr_text = stderr_history_by_line.get(line_number)
+        if stderr_text:
+            annotated_program.append(format_output_precomputed(stderr_text))
+        stdout_text = stdout_history_by_line.get(line_number)
+        if stdout_text:
+            annotated_program.append(format_output_precomputed(stdout_text))
 
-    return annotated_program
+    return ''.join(annotated_program)
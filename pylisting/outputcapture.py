@@ -14,21 +14,29 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from contextlib import AbstractContextManager
-from dataclasses import dataclass
-import inspect
 import sys
+from typing import NamedTuple
 
 
-@dataclass
-class Output(object):
+class Output(NamedTuple):
     """Object to store traceback information when something is written to,
     e.g., stdout.
+
+    This is a tuple, so each one is created in a single allocation and has
+    no per-instance __dict__.
     """
     value: str
     caller_filename: str
     caller_line: int
 
 
+class CallerInfo(NamedTuple):
+    """The filename and line number of a caller target's frame.
+    """
+    filename: str
+    lineno: int
+
+
 class CallerTargetNotFoundError(Exception):
     """Exception raised when the caller target cannot be found.
     """
@@ -40,7 +48,8 @@ class OutputTracker(object):
         """(Read-only) file-like object to keep track of everything written to,
         e.g., stdout. This can optionally be passed through to another object.
 
-        Access the output history in self.history.
+        Access the output history in self.history. This is the list the
+        Output objects are appended to, so it may be modified or replaced.
 
         Parameters
         ----------
@@ -51,7 +60,7 @@ class OutputTracker(object):
             The target caller to log. This can be either:
             * An int, in which case this element in the call stack (excepting
                 the methods of OutputTracker) is used.
-            * A str, in which case inspect.stack() is traversed until a
+            * A str, in which case the call stack is traversed until a
                 filename matching the str is found.
             Default is 0 (use the immediate caller of the write function). If
             the caller target cannot be found, the value will be silently
@@ -61,30 +70,86 @@ class OutputTracker(object):
         self.passthrough = passthrough
         self.caller_target = caller_target
 
+    @property
+    def passthrough(self):
+        """file-like or None: The object values are passed through to.
+        """
+        return self._passthrough
+
+    @passthrough.setter
+    def passthrough(self, passthrough):
+        # Keep the bound write method alongside, so that write does not have
+        # to look it up every time.
+        self._passthrough = passthrough
+        self._passthrough_write = (
+            passthrough.write if passthrough is not None else None
+        )
+
+    @property
+    def history(self):
+        """list of Output: Each call to write, in the order it occurred.
+        """
+        return self._history
+
+    @history.setter
+    def history(self, history):
+        # Keep the bound append method alongside, so that write does not have
+        # to look it up every time.
+        self._history = history
+        self._history_append = history.append
+
     def get_caller(self):
-        """Get the calling frame's info. If the requested caller target can't
-        be matched, a CallerTargetNotFoundError is raised.
+        """Get the info of the caller target, as seen from the caller of the
+        method which calls get_caller (normally write). If the requested
+        caller target can't be matched, a CallerTargetNotFoundError is raised.
 
         Returns
         -------
-        caller : namedtuple
-            The info on the calling frame.
+        caller : CallerInfo
+            The filename and line number of the calling frame.
         """
+        frame = sys._getframe(1)
         if isinstance(self.caller_target, int):
-            try:
-                frame = inspect.stack()[self.caller_target + 2].frame
-            except IndexError:
-                frame = None
+            # Skip the method which called get_caller. A str target is
+            # searched for from get_caller's caller onward, as before.
+            frame = frame.f_back
+        frame = self._find_caller_frame(frame)
+        if frame is not None:
+            return CallerInfo(frame.f_code.co_filename, frame.f_lineno)
         else:
-            frame = None
-            for entry in inspect.stack():
-                if entry.filename == self.caller_target:
-                    frame = entry.frame
+            raise CallerTargetNotFoundError('Caller target not found!')
+
+    def _find_caller_frame(self, frame):
+        """Find the frame of the caller target. Both write and get_caller
+        resolve the caller target through this method.
+
+        Parameters
+        ----------
+        frame : frame or None
+            The frame which called into OutputTracker, i.e., caller target 0.
+
+        Returns
+        -------
+        frame : frame or None
+            The frame of the caller target, or None if it can't be found.
+        """
+        if isinstance(self.caller_target, int):
+            for _ in range(self.caller_target):
+                if frame is None:
                     break
-        if frame:
-            return inspect.getframeinfo(frame)
+                frame = frame.f_back
+            return frame
         else:
-            raise CallerTargetNotFoundError('Caller target not found!')
+            # The nearest matching frame is the target, so the stack has to be
+            # walked every time: a depth cached from an earlier write could
+            # skip over a nearer matching frame. When the program writes
+            # directly (e.g., a bare print), the first frame checked is the
+            # match.
+            while frame is not None:
+                if frame.f_code.co_filename == self.caller_target:
+                    return frame
+                frame = frame.f_back
+            return None
 
     def write(self, value):
         """Write a string.
@@ -94,20 +159,19 @@ class OutputTracker(object):
         value : str
             The value to write.
         """
-        try:
-            caller = self.get_caller()
-            self.history.append(
-                Output(
-                    value=value,
-                    caller_filename=caller.filename,
-                    caller_line=caller.lineno
+        frame = self._find_caller_frame(sys._getframe(1))
+        if frame is not None:
+            # tuple.__new__ builds the Output directly, skipping the Python
+            # level __new__ which NamedTuple generates.
+            self._history_append(
+                tuple.__new__(
+                    Output, (value, frame.f_code.co_filename, frame.f_lineno)
                 )
             )
-        except CallerTargetNotFoundError:
-            pass
 
-        if self.passthrough:
-            self.passthrough.write(value)
+        passthrough_write = self._passthrough_write
+        if passthrough_write is not None:
+            passthrough_write(value)
 
 
 class CaptureContext(AbstractContextManager):
@@ -118,26 +182,32 @@ class CaptureContext(AbstractContextManager):
 
         Parameters
         ----------
-        stdout_tracker : OutputTracker
-            The OutputTracker to use to capture things written to stdout.
-        stderr_tracker : OutputTracker
-            The OutputTracker to use to capture things written to stderr.
+        stdout_tracker : OutputTracker or None
+            The OutputTracker to use to capture things written to stdout. If
+            None, stdout is left in place.
+        stderr_tracker : OutputTracker or None
+            The OutputTracker to use to capture things written to stderr. If
+            None, stderr is left in place.
         """
         self.stdout_tracker = stdout_tracker
         self.stderr_tracker = stderr_tracker
 
     def __enter__(self):
-        self.original_stdout = sys.stdout
-        self.original_stderr = sys.stderr
-        sys.stdout = self.stdout_tracker
-        sys.stderr = self.stderr_tracker
+        if self.stdout_tracker is not None:
+            self.original_stdout = sys.stdout
+            sys.stdout = self.stdout_tracker
+        if self.stderr_tracker is not None:
+            self.original_stderr = sys.stderr
+            sys.stderr = self.stderr_tracker
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        sys.stdout = self.original_stdout
-        sys.stderr = self.original_stderr
+        if self.stdout_tracker is not None:
+            sys.stdout = self.original_stdout
+        if self.stderr_tracker is not None:
+            sys.stderr = self.original_stderr
 
 
-def run_and_capture_output(program):
+def run_and_capture_output(program, capture_stderr=True):
     """Run the given Python code and capture everything it writes to stdout and
     stderr. Note that stderr is captured, but exceptions are not caught. The
     Python code is run with __name__ = '__main__', so code in a main guard will
@@ -147,21 +217,34 @@ def run_and_capture_output(program):
     ----------
     program : str
         The program to run.
+    capture_stderr : bool, optional
+        Whether or not to capture stderr. Every write to a captured stream
+        has to look up its caller, so if the program's stderr output (e.g.,
+        warnings) is not needed, setting this to False avoids that cost and
+        leaves stderr untouched. Default is True.
 
     Returns
     -------
     stdout_history : list of Output
         Each call to stdout.write, in the order it occurred.
     stderr_history : list of Output
-        Each call to stderr.write, in the order it occurred.
+        Each call to stderr.write, in the order it occurred. Empty if
+        capture_stderr is False.
     """
     stdout_tracker = OutputTracker(
         passthrough=sys.stdout, caller_target='<string>'
     )
-    stderr_tracker = OutputTracker(
-        passthrough=sys.stderr, caller_target='<string>'
-    )
+    if capture_stderr:
+        stderr_tracker = OutputTracker(
+            passthrough=sys.stderr, caller_target='<string>'
+        )
+    else:
+        stderr_tracker = None
     with CaptureContext(stdout_tracker, stderr_tracker):
         exec(program, {'__name__': '__main__'})
 
-    return stdout_tracker.history, stderr_tracker.history
+    if stderr_tracker is not None:
+        stderr_history = stderr_tracker.history
+    else:
+        stderr_history = []
+    return stdout_tracker.history, stderr_history
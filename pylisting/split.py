@@ -15,8 +15,13 @@
 
 import re
 
+_DEFAULT_CELL_REGEX = r'^# In\[[0-9]+\]:$'
+_DEFAULT_CELL_PATTERN = re.compile(_DEFAULT_CELL_REGEX, re.MULTILINE)
+# Line boundaries which str.splitlines recognizes in addition to '\n'.
+_OTHER_LINE_BOUNDARY = re.compile('[\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]')
 
-def split_by_cell(program, cell_regex=r'^# In\[[0-9]+\]:$'):
+
+def split_by_cell(program, cell_regex=_DEFAULT_CELL_REGEX):
     """Split a given program (such as exported from a Jupyter notebook) into
     separate cells.
 
@@ -24,23 +29,64 @@ def split_by_cell(program, cell_regex=r'^# In\[[0-9]+\]:$'):
     ----------
     program : str
         The program to split.
-    cell_regex : str, optional
-        The regex to match cell boundaries. Default is consistent with the
-        cell markers used in files which are exported from Jupyter notebooks.
+    cell_regex : str or compiled regex, optional
+        The regex to match cell boundaries. It is searched for in each line
+        separately, where lines are split as by str.splitlines. Default is
+        consistent with the cell markers used in files which are exported from
+        Jupyter notebooks.
 
     Returns
     -------
     program_split : list of str
-        The text from each cell of the program.
+        The text from each cell of the program. Line endings are converted to
+        '\n'.
     """
+    if (
+        cell_regex is _DEFAULT_CELL_REGEX
+        and _OTHER_LINE_BOUNDARY.search(program) is None
+    ):
+        return _split_by_default_cell(program)
+
     cell_regex = re.compile(cell_regex)
 
-    program_split = ['']
+    program_split = [[]]
     for line in program.splitlines():
         match = cell_regex.search(line)
         if match:
-            program_split.append('')
+            program_split.append([])
+
+        program_split[-1].append(line + '\n')
+
+    return [''.join(cell_lines) for cell_lines in program_split]
+
+
+def _split_by_default_cell(program):
+    """Split a program which only uses '\n' line boundaries at the default cell
+    markers.
+
+    The default pattern cannot match across a line boundary, so it is run over
+    the whole program at once, and the cells are sliced out at the start of
+    each matching line rather than rebuilt line by line.
+
+    Parameters
+    ----------
+    program : str
+        The program to split.
+
+    Returns
+    -------
+    program_split : list of str
+        The text from each cell of the program.
+    """
+    if program and not program.endswith('\n'):
+        program += '\n'
 
-        program_split[-1] += line + '\n'
+    program_split = []
+    cell_start = 0
+    for match in _DEFAULT_CELL_PATTERN.finditer(program):
+        line_start = match.start()
+        program_split.append(program[cell_start:line_start])
+        cell_start = line_start
+    program_split.append(program[cell_start:])
 
     return program_split
@@ -15,11 +15,24 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import os
 from distutils.core import setup
 
+# Set PYLISTING_USE_MYPYC=1 to compile pylisting.annotate with mypyc. The
+# compiled module takes precedence over the .py file when both are present.
+# pylisting.outputcapture is always left as pure Python, since it finds the
+# caller of write by walking the interpreter's frames, and compiled functions
+# do not have frames.
+if os.environ.get('PYLISTING_USE_MYPYC', '0') == '1':
+    from mypyc.build import mypycify
+    ext_modules = mypycify(['pylisting/annotate.py'])
+else:
+    ext_modules = []
+
 setup(
     name='pylisting',
     version='1.0',
     py_modules='pylisting',
-    scripts=['bin/pylisting-annotate', 'bin/pylisting-split']
+    scripts=['bin/pylisting-annotate', 'bin/pylisting-split'],
+    ext_modules=ext_modules
 )
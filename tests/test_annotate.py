@@ -0,0 +1,58 @@
+# Copyright 2021 Mark Chilenski
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import unittest
+
+from pylisting.annotate import annotate_program, group_by_line
+from pylisting.outputcapture import Output
+
+
+class TestAnnotateProgram(unittest.TestCase):
+    def test_line_endings(self):
+        stdout_history = [
+            Output('a\n', '<string>', 2), Output('b\n', '<string>', 3)
+        ]
+        expected = "x = 1\nprint('a')\n# a\nprint('b')\n# b\n"
+        for newline in ['\n', '\r\n', '\r']:
+            program = newline.join(
+                ['x = 1', "print('a')", "print('b')", '']
+            )
+            with self.subTest(newline=repr(newline)):
+                self.assertEqual(
+                    annotate_program(program, stdout_history, []), expected
+                )
+
+    def test_form_feed_does_not_split_line(self):
+        program = "x = 1\n\x0cprint('a')\n"
+        stdout_history = [Output('a\n', '<string>', 2)]
+        self.assertEqual(
+            annotate_program(program, stdout_history, []),
+            "x = 1\n\x0cprint('a')\n# a\n"
+        )
+
+
+class TestGroupByLine(unittest.TestCase):
+    def test_group_by_line(self):
+        history = [
+            Output('a', '<string>', 2), Output('b\n', '<string>', 2),
+            Output('c\n', '<string>', 3), Output('d\n', 'other.py', 10 ** 7)
+        ]
+        self.assertEqual(
+            group_by_line(history), {2: 'ab\n', 3: 'c\n', 10 ** 7: 'd\n'}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+# Copyright 2021 Mark Chilenski
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import os.path
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+from pylisting.outputcapture import (
+    CaptureContext, OutputTracker, run_and_capture_output
+)
+
+
+class TestRunAndCaptureOutput(unittest.TestCase):
+    def run_quietly(self, program):
+        with mock.patch('sys.stdout', io.StringIO()), \
+                mock.patch('sys.stderr', io.StringIO()):
+            return run_and_capture_output(program)
+
+    def test_nearest_caller_target_is_used(self):
+        # The same library function is reached first from module level
+        # (through an extra frame) and then from inside a function defined in
+        # the program. Each write must go to the nearest program line.
+        with tempfile.TemporaryDirectory() as lib_dir:
+            with open(os.path.join(lib_dir, 'pylisting_test_lib.py'),
+                      'w') as lib_file:
+                lib_file.write(textwrap.dedent("""\
+                    import sys
+
+                    def g():
+                        sys.stdout.write('x\\n')
+
+                    def h():
+                        g()
+                """))
+            sys.path.insert(0, lib_dir)
+            try:
+                stdout_history, _ = self.run_quietly(textwrap.dedent("""\
+                    import pylisting_test_lib
+                    pylisting_test_lib.h()
+                    def f():
+                        pylisting_test_lib.g()
+                    f()
+                """))
+            finally:
+                sys.path.remove(lib_dir)
+                sys.modules.pop('pylisting_test_lib', None)
+
+        self.assertEqual(
+            [output.caller_line for output in stdout_history], [2, 4]
+        )
+
+
+class TestOutputTracker(unittest.TestCase):
+    def test_reassign_passthrough(self):
+        first = io.StringIO()
+        second = io.StringIO()
+        tracker = OutputTracker(passthrough=first)
+        tracker.write('a')
+        tracker.passthrough = second
+        tracker.write('b')
+        tracker.passthrough = None
+        tracker.write('c')
+        self.assertIsNone(tracker.passthrough)
+        self.assertEqual(first.getvalue(), 'a')
+        self.assertEqual(second.getvalue(), 'b')
+        self.assertEqual(
+            [output.value for output in tracker.history], ['a', 'b', 'c']
+        )
+
+    def test_reassign_history(self):
+        tracker = OutputTracker()
+        tracker.write('a')
+        old_history = tracker.history
+        new_history = []
+        tracker.history = new_history
+        tracker.write('b')
+        self.assertIs(tracker.history, new_history)
+        self.assertEqual([output.value for output in old_history], ['a'])
+        self.assertEqual([output.value for output in new_history], ['b'])
+
+
+class TestCaptureContext(unittest.TestCase):
+    def test_stderr_left_in_place(self):
+        original_stdout = sys.stdout
+        original_stderr = sys.stderr
+        stdout_tracker = OutputTracker()
+        with CaptureContext(stdout_tracker, None):
+            self.assertIs(sys.stdout, stdout_tracker)
+            self.assertIs(sys.stderr, original_stderr)
+        self.assertIs(sys.stdout, original_stdout)
+        self.assertIs(sys.stderr, original_stderr)
+
+    def test_run_without_capturing_stderr(self):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with mock.patch('sys.stdout', stdout), \
+                mock.patch('sys.stderr', stderr):
+            stdout_history, stderr_history = run_and_capture_output(
+                textwrap.dedent("""\
+                    import sys
+                    print('a')
+                    sys.stderr.write('b\\n')
+                    print('c')
+                """),
+                capture_stderr=False
+            )
+            self.assertIs(sys.stderr, stderr)
+
+        self.assertEqual(stderr_history, [])
+        self.assertEqual(stderr.getvalue(), 'b\n')
+        self.assertEqual(
+            [(output.value, output.caller_line) for output in stdout_history],
+            [('a', 2), ('\n', 2), ('c', 4), ('\n', 4)]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
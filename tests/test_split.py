@@ -0,0 +1,65 @@
+# Copyright 2021 Mark Chilenski
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+import unittest
+
+from pylisting.split import split_by_cell
+
+
+class TestSplitByCell(unittest.TestCase):
+    def test_crlf_line_endings(self):
+        self.assertEqual(
+            split_by_cell('x\r\n# In[1]:\r\ny\r\n'),
+            ['x\n', '# In[1]:\ny\n']
+        )
+
+    def test_compiled_cell_regex(self):
+        program = 'x\n# In[1]:\ny\n'
+        expected = ['x\n', '# In[1]:\ny\n']
+        self.assertEqual(
+            split_by_cell(program, re.compile(r'^# In\[[0-9]+\]:$')),
+            expected
+        )
+        self.assertEqual(
+            split_by_cell(
+                program, re.compile(r'^# In\[[0-9]+\]:$', re.MULTILINE)
+            ),
+            expected
+        )
+
+    def test_custom_regex_does_not_span_lines(self):
+        self.assertEqual(
+            split_by_cell('x = 1\n\n\n# %%\ny = 2\n', r'^\s*# %%'),
+            ['x = 1\n\n\n', '# %%\ny = 2\n']
+        )
+        self.assertEqual(
+            split_by_cell('x = 1\n\n\ny = 2\n', r'^\s*$'),
+            ['x = 1\n', '\n', '\ny = 2\n']
+        )
+        self.assertEqual(
+            split_by_cell('x = 1 #\nIn = 2\n', r'#\s*In'),
+            ['x = 1 #\nIn = 2\n']
+        )
+
+    def test_form_feed_starts_line(self):
+        self.assertEqual(
+            split_by_cell('x\n\x0c# In[5]:\ny\n'),
+            ['x\n\n', '# In[5]:\ny\n']
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()